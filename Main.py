@@ -7,6 +7,8 @@ import re
 from refine import refine_values  # Import refine_values function
 from populate_calculator import populate_piping, populate_ductwork  # Import populate functions
 
+DATE_RE = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$')  # Matches MM/DD/YYYY
+
 
 def is_date(value):
     """
@@ -16,8 +18,7 @@ def is_date(value):
     Returns:
         bool: True if the value matches the date format, otherwise False.
     """
-    date_pattern = r'^\d{1,2}/\d{1,2}/\d{4}$'  # Matches MM/DD/YYYY
-    if isinstance(value, str) and re.match(date_pattern, value):
+    if isinstance(value, str) and DATE_RE.match(value):
         return True
     return False
 
@@ -31,26 +32,33 @@ def process_csv_to_excel(data_file, template_file, output_file):
         data_file (str): Path to the CSV file containing the data.
         template_file (str): Path to the Excel file template (.xlsx).
         output_file (str): Path to save the modified output file (.xlsx).
+    Returns:
+        bool: True if the output file was written, otherwise False.
     """
     try:
         # Copy the template file to the output file
         print(f"Copying template file to {output_file}...")
         shutil.copy(template_file, output_file)
 
-        # Read the CSV file, handle rows with varying columns
+        # Read the CSV file, padding short rows to exactly 9 columns (longer rows are skipped)
         print("Reading the CSV file...")
-        data = pd.read_csv(data_file, header=None, on_bad_lines="skip", engine="python")
-
-        # Ensure all rows have exactly 9 columns
-        print("Trimming and padding rows with placeholders...")
-        data = data.apply(
-            lambda x: [val if pd.notna(val) and val != "" else (0 if i in [1, 3, 6, 7, 8] else "-") for i, val in enumerate(x[:9])]
-            + [""] * (9 - len(x)),
-            axis=1,
-        )
-
-        # Convert the adjusted data back to a DataFrame
-        data = pd.DataFrame(data.tolist())
+        data = pd.read_csv(data_file, header=None, names=range(9),
+                           on_bad_lines="skip", engine="c")
+
+        # Fill empty cells with placeholders, one column at a time
+        print("Filling empty cells with placeholders...")
+        numeric_cols = [1, 3, 6, 7, 8]
+        text_cols = [0, 2, 4, 5]
+        for col in numeric_cols:
+            data[col] = data[col].fillna(0).replace("", 0)
+        for col in text_cols:
+            data[col] = data[col].fillna("-").replace("", "-")
+
+        # Remove entirely empty rows based on Column A before anything is written,
+        # instead of deleting them from the worksheet one by one afterwards.
+        # Empty names have already been replaced by the '-' placeholder at this point.
+        print("Removing empty rows...")
+        data = data[data[0].notna() & (data[0].astype(str) != "") & (data[0] != "-")]
 
         # Open the output Excel file
         print("Loading the output file...")
@@ -69,25 +77,18 @@ def process_csv_to_excel(data_file, template_file, output_file):
 
         # Process rows in the cleaned DataFrame
         print("Processing rows...")
-        for row in data.itertuples(index=False):
+        for row in data.itertuples(index=False, name=None):
             sheet_out.append(row)
 
-        # Remove entirely empty rows based on Column A
-        print("Removing empty rows from the output...")
-        row_num = 2  # Start after the header row
-        while row_num <= sheet_out.max_row:
-            if not sheet_out.cell(row=row_num, column=1).value:  # Check Column A
-                sheet_out.delete_rows(row_num)
-            else:
-                row_num += 1
-
         # Save the modified output file
         print(f"Saving changes to {output_file}...")
         workbook_out.save(output_file)
         print("Process completed successfully!")
+        return True
 
     except Exception as e:
         print(f"An error occurred: {e}")
+        return False
 
 
 
@@ -98,12 +99,21 @@ if __name__ == "__main__":
     template_file = r"C:...." #<---- INPUT DIRECTORY OF YOUR TEMPLATE HERE
     output_file = "M Breakdown.xlsx"  # Path to the local output file
 
-    # Step 1: Process input data
-    process_csv_to_excel(data_file, template_file, output_file)
+    # Step 1: Process input data (the remaining steps need its output file)
+    if process_csv_to_excel(data_file, template_file, output_file):
+        try:
+            # Load the output once and share it between the remaining steps
+            workbook = load_workbook(output_file)
+
+            # Step 2: Refine values
+            refine_values(workbook)
+
+            # Step 3: Populate calculator
+            populate_piping(workbook)
+            populate_ductwork(workbook)
 
-    # Step 2: Refine values
-    refine_values(output_file)
+            print(f"Saving changes to {output_file}...")
+            workbook.save(output_file)
 
-    # Step 3: Populate calculator
-    populate_piping(output_file)
-    populate_ductwork(output_file)
+        except Exception as e:
+            print(f"An error occurred: {e}")
@@ -1,135 +1,214 @@
+import logging
 import openpyxl
+import pandas as pd
 import re
 
-def populate_piping(output_file):
+logger = logging.getLogger(__name__)
+
+# Pipe size in an item name, e.g. 1-1/2, 3/4, 2-1 or 2 (longest forms first)
+SIZE_RE = re.compile(r'(\d+-\d+/\d+|\d+-\d+|\d+/\d+|\d+)')
+
+# Sized piping sections as (name keyword, section, column offset from 'INPUT AREA')
+SIZED_PIPING = [
+    ("condensate drain", "Condensate drain", 1),
+    ("equipment riser & branch piping", "Copper", 2),
+    ("sch 40 blk iron", "SCH40", 3),
+]
+
+# Ductwork categories summed from the "Qty" column => cell label in Mechanical Breakdown
+BASE_CATEGORIES = {
+    "Galvanized Steel": "Input Galvanized Steel",
+    "Residential Kitchen": "Input Residential Kitchen",
+    "Commercial Kitchen": "Input Commercial Kitchen",
+    "Aluminum": "Input Aluminum",
+    "Flat Oval": " Input Flat Oval",
+    "316 SS 18 Gauge DX": " (Usually Ignore) Stainless Steel"
+}
+
+# Acoustically Lined / Insulated / Fire-Wrapped combos summed from the "Square feet" column
+# => cell label in Mechanical Breakdown, e.g., "Acoustically Lined Galvanized Steel" => "Input Acoustical Lining (SqFt)"
+# define "Acoustically Lined *Category*" => same label,
+# "Insulated *Category*" => same label, etc.
+SQ_CATEGORIES = {
+    # For each base, define the combos
+    "Acoustically Lined Galvanized Steel": "Input Acoustical Lining (SqFt)",
+    "Insulated Galvanized Steel": "Input Insulation (SqFt)",
+    "Fire Wrapped Galvanized Steel": "Input Fire Wrapped (SqFt)",
+
+    "Acoustically Lined Residential Kitchen": "Input Acoustical Lining (SqFt)",
+    "Insulated Residential Kitchen": "Input Insulation (SqFt)",
+    "Fire Wrapped Residential Kitchen": "Input Fire Wrapped (SqFt)",
+
+    "Acoustically Lined Commercial Kitchen": "Input Acoustical Lining (SqFt)",
+    "Insulated Commercial Kitchen": "Input Insulation (SqFt)",
+    "Fire Wrapped Commercial Kitchen": "Input Fire Wrapped (SqFt)",
+
+    "Acoustically Lined Aluminum": "Input Acoustical Lining (SqFt)",
+    "Insulated Aluminum": "Input Insulation (SqFt)",
+    "Fire Wrapped Aluminum": "Input Fire Wrapped (SqFt)",
+
+    "Acoustically Lined Flat Oval": "Input Acoustical Lining (SqFt)",
+    "Insulated Flat Oval": "Input Insulation (SqFt)",
+    "Fire Wrapped Flat Oval": "Input Fire Wrapped (SqFt)",
+
+    "Acoustically Lined 316 SS 18 Gauge DX": "Input Acoustical Lining (SqFt)",
+    "Insulated 316 SS 18 Gauge DX": "Input Insulation (SqFt)",
+    "Fire Wrapped 316 SS 18 Gauge DX": "Input Fire Wrapped (SqFt)",
+}
+
+# One alternation per category table, so a lowercased name is scanned once for all of its categories
+BASE_CATEGORIES_RE = re.compile('|'.join(re.escape(cat.lower()) for cat in sorted(BASE_CATEGORIES, key=len, reverse=True)))
+SQ_CATEGORIES_RE = re.compile('|'.join(re.escape(cat.lower()) for cat in sorted(SQ_CATEGORIES, key=len, reverse=True)))
+
+
+def locate_labels(sheet, labels, markers=()):
+    """
+    Scans a sheet once and records every cell that contains one of the given labels.
+    Like the original per-label searches, only the first matching cell in each row is kept.
+
+    Args:
+        sheet (Worksheet): The worksheet to scan.
+        labels (iterable of str): The label strings to look for (substring match).
+        markers (iterable of str): Upper-case strings that must equal the whole cell value,
+                                   ignoring case and surrounding whitespace (e.g. 'INPUT AREA').
+
+    Returns:
+        dict: Maps each label and marker to a list of (row, column) positions where it was found.
+    """
+    locations = {label: [] for label in labels}
+    marker_locations = {marker: [] for marker in markers}
+    for row_idx, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+        found_in_row = set()
+        for col_idx, value in enumerate(row, start=1):
+            if not isinstance(value, str):
+                continue
+            for label in locations:
+                if label not in found_in_row and label in value:
+                    locations[label].append((row_idx, col_idx))
+                    found_in_row.add(label)
+            if marker_locations:
+                marker = value.strip().upper()
+                if marker in marker_locations:
+                    marker_locations[marker].append((row_idx, col_idx))
+    locations.update(marker_locations)
+    return locations
+
+def sum_by_category(names, values, pattern, categories):
+    """
+    Sums values per category, where a row counts once towards every category found in its name.
+
+    Args:
+        names (iterable of str): Lowercased item names.
+        values (iterable of float): The value to add for each name.
+        pattern (Pattern): Compiled alternation of the lowercased category names.
+        categories (iterable of str): The category names, as used for the returned keys.
+
+    Returns:
+        dict: Maps each category to its total (0 if nothing matched).
+    """
+    by_key = {cat.lower(): cat for cat in categories}
+    totals = {cat: 0 for cat in categories}
+    for name, value in zip(names, values):
+        for key in set(pattern.findall(name)):
+            totals[by_key[key]] += value
+    return totals
+
+def read_refined_values(workbook):
+    """
+    Reads the 'Refined values' sheet into a DataFrame from its cell values.
+
+    Args:
+        workbook (Workbook): The loaded workbook containing the 'Refined values' sheet.
+
+    Returns:
+        DataFrame: The refined rows, with the sheet's header row as column names.
+    """
+    rows = workbook['Refined values'].iter_rows(values_only=True)
+    header = next(rows)
+    return pd.DataFrame(rows, columns=header)
+
+def populate_piping(workbook):
     """
     Populates predefined areas in the 'Mechanical Breakdown' sheet for piping sections (Refrigerant and Condensate Drain)
     using data from the 'Refined values' sheet in the same workbook. It looks for the 'INPUT AREA' marker and restricts
     size detection to that column.
 
     Args:
-        output_file (str): Path to the output Excel file containing both 'Refined values' and 'Mechanical Breakdown' sheets.
+        workbook (Workbook): The loaded workbook containing both 'Refined values' and 'Mechanical Breakdown' sheets.
+                             Saving is left to the caller.
     """
     try:
-        print("Loading workbook...")
-        workbook = openpyxl.load_workbook(output_file)
-
         if 'Refined values' not in workbook.sheetnames:
             raise ValueError("'Refined values' sheet not found in the workbook.")
 
         if 'Mechanical Breakdown' not in workbook.sheetnames:
             raise ValueError("'Mechanical Breakdown' sheet not found in the workbook.")
 
-        refined_sheet = workbook['Refined values']
+        refined_df = read_refined_values(workbook)
         breakdown_sheet = workbook['Mechanical Breakdown']
 
-        # Locate the 'INPUT AREA' cell to restrict size detection to its column
+        # Index the breakdown labels and the 'INPUT AREA' marker in a single pass over the sheet
         print("Locating 'INPUT AREA'...")
-        input_area_column = None
-        for row in breakdown_sheet.iter_rows(min_row=1, max_col=breakdown_sheet.max_column, values_only=False):
-            for cell in row:
-                if isinstance(cell.value, str) and cell.value.strip().upper() == "INPUT AREA":
-                    input_area_column = cell.column
-                    print(f"'INPUT AREA' found in column {input_area_column}.")
-                    break
-            if input_area_column:
-                break
-
-        if input_area_column is None:
+        label_locations = locate_labels(breakdown_sheet, ["Input Refrigerant Piping"], markers=["INPUT AREA"])
+
+        # The first 'INPUT AREA' cell restricts size detection to its column
+        if not label_locations["INPUT AREA"]:
             raise ValueError("'INPUT AREA' not found in the 'Mechanical Breakdown' sheet.")
+        _, input_area_column = label_locations["INPUT AREA"][0]
+        print(f"'INPUT AREA' found in column {input_area_column}.")
+
+        # Map each size in the 'INPUT AREA' column to its row, streaming the column's values once
+        col_values = next(breakdown_sheet.iter_cols(min_col=input_area_column, max_col=input_area_column, values_only=True))
+        size_column = {str(value).strip(): row for row, value in enumerate(col_values, start=1) if isinstance(value, str)}
 
-        # Process Refrigerant Piping
-        print("Processing refrigerant piping...")
+        # Process Refrigerant, Condensate Drain, Copper and SCH40 in a single pass over "Refined values"
+        print("Processing refrigerant, condensate drain, Copper and SCH40 piping...")
         refrigerant_value = None
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, qty, *_ = row  # Skip the second column
-            if isinstance(name, str) and "refrigerant" in name.lower():
+        placed = not_found = no_size = 0
+        for name, _, qty, *_ in refined_df.itertuples(index=False, name=None):  # Skip the second column
+            if not isinstance(name, str):
+                continue
+            name_lower = name.lower()
+
+            if refrigerant_value is None and "refrigerant" in name_lower:
                 refrigerant_value = qty
-                break
 
-        if refrigerant_value is not None:
-            for row in breakdown_sheet.iter_rows(min_row=1, max_col=breakdown_sheet.max_column):
-                for cell in row:
-                    if isinstance(cell.value, str) and "Input Refrigerant Piping" in cell.value:
-                        target_cell = breakdown_sheet.cell(row=cell.row, column=cell.column + 1)
-                        target_cell.value = refrigerant_value
-                        print(f"Refrigerant piping value '{refrigerant_value}' placed in cell {target_cell.coordinate}.")
-                        break
-
-        # Process Condensate Drain
-        print("Processing condensate drain...")
-        size_column = {
-            str(breakdown_sheet.cell(row=row, column=input_area_column).value).strip(): row
-            for row in range(1, breakdown_sheet.max_row + 1)
-            if isinstance(breakdown_sheet.cell(row=row, column=input_area_column).value, str)
-        }
-
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, qty, *_ = row  # Skip the second column
-            if isinstance(name, str) and "condensate drain" in name.lower():
+            for keyword, section, offset in SIZED_PIPING:
+                if keyword not in name_lower:
+                    continue
                 # Match the full size string, including fractions and quotes
-                match = re.search(r'(\d+-\d+/\d+|\d+/\d+|\d+-\d+|\d+)', name)
-                if match:
-                    size = match.group(0).strip()
-                    size = size + '"' if '"' not in size else size  # Ensure size includes the quote
-                    if size in size_column:
-                        target_row = size_column[size]
-                        target_cell = breakdown_sheet.cell(row=target_row, column=input_area_column + 1)  # Place value in the next column
-                        target_cell.value = qty
-                        print(f"Condensate drain value '{qty}' placed in row {target_row}, column {input_area_column + 1} for size '{size}'.")
-                    else:
-                        print(f"Size '{size}' not found in column {input_area_column}.")
-                else:
-                    print(f"No valid size found in: {name}")
-        
-        # Process Copper
-        print("Processing Copper...")
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, qty, *_ = row
-            if isinstance(name, str) and "equipment riser & branch piping" in name.lower():
-                match = re.search(r'(\d+-\d+/\d+|\d+/\d+|\d+-\d+|\d+)', name)
+                match = SIZE_RE.search(name)
                 if match:
                     size = match.group(0).strip()
                     size = size + '"' if '"' not in size else size  # Ensure size includes the quote
                     if size in size_column:
                         target_row = size_column[size]
-                        target_cell = breakdown_sheet.cell(row=target_row, column=input_area_column + 2)  # Copper column
+                        target_cell = breakdown_sheet.cell(row=target_row, column=input_area_column + offset)
                         target_cell.value = qty
-                        print(f"Copper value '{qty}' placed in row {target_row}, column {input_area_column + 2} for size '{size}'.")
+                        placed += 1
+                        logger.debug("%s value '%s' placed in row %s, column %s for size '%s'.",
+                                     section, qty, target_row, input_area_column + offset, size)
                     else:
-                        print(f"Size '{size}' not found in column {input_area_column} for Copper.")
+                        not_found += 1
+                        logger.debug("Size '%s' not found in column %s for %s.", size, input_area_column, section)
                 else:
-                    print(f"No valid size found in: {name}")
-
-        # Process SCH40
-        print("Processing SCH40...")
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, qty, *_ = row
-            if isinstance(name, str) and "sch 40 blk iron" in name.lower():
-                match = re.search(r'(\d+-\d+/\d+|\d+/\d+|\d+-\d+|\d+)', name)
-                if match:
-                    size = match.group(0).strip()
-                    size = size + '"' if '"' not in size else size  # Ensure size includes the quote
-                    if size in size_column:
-                        target_row = size_column[size]
-                        target_cell = breakdown_sheet.cell(row=target_row, column=input_area_column + 3)  # SCH40 column
-                        target_cell.value = qty
-                        print(f"SCH40 value '{qty}' placed in row {target_row}, column {input_area_column + 3} for size '{size}'.")
-                    else:
-                        print(f"Size '{size}' not found in column {input_area_column} for SCH40.")
-                else:
-                    print(f"No valid size found in: {name}")
+                    no_size += 1
+                    logger.debug("No valid size found in: %s", name)
 
+        print(f"Placed {placed} sized piping values ({not_found} sizes not found, {no_size} names without a size).")
+
+        if refrigerant_value is not None:
+            for row, column in label_locations["Input Refrigerant Piping"]:
+                target_cell = breakdown_sheet.cell(row=row, column=column + 1)
+                target_cell.value = refrigerant_value
+                print(f"Refrigerant piping value '{refrigerant_value}' placed in cell {target_cell.coordinate}.")
 
-        # Save the updated workbook
-        print(f"Saving changes to {output_file}...")
-        workbook.save(output_file)
         print("Piping section populated successfully!")
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def populate_ductwork(output_file):
+def populate_ductwork(workbook):
     """
     Populates the 'Mechanical Breakdown' sheet for the ductwork section by summing all values
     for specified categories in the 'Refined values' sheet and placing the totals in predefined cells.
@@ -140,63 +219,54 @@ def populate_ductwork(output_file):
         in the "Square feet" column, feeding into the appropriate mechanical breakdown cells.
 
     If a cell already contains a number, new sums are added (accumulated).
+
+    Args:
+        workbook (Workbook): The loaded workbook containing both 'Refined values' and 'Mechanical Breakdown' sheets.
+                             Saving is left to the caller.
     """
     try:
-        print("Loading workbook...")
-        workbook = openpyxl.load_workbook(output_file)
-
         if 'Refined values' not in workbook.sheetnames:
             raise ValueError("'Refined values' sheet not found in the workbook.")
 
         if 'Mechanical Breakdown' not in workbook.sheetnames:
             raise ValueError("'Mechanical Breakdown' sheet not found in the workbook.")
 
-        refined_sheet = workbook['Refined values']
+        refined_df = read_refined_values(workbook)
         breakdown_sheet = workbook['Mechanical Breakdown']
 
+        # Index every breakdown label (base and combo) in a single pass over the sheet
+        label_locations = locate_labels(breakdown_sheet, set(BASE_CATEGORIES.values()) | set(SQ_CATEGORIES.values()))
+
+        # Category matching below runs on the "Refined values" columns
+        names = refined_df['Name'].astype(str).str.lower()
+        qty = pd.to_numeric(refined_df['Total Qty'], errors='coerce').fillna(0)
+        sq_ft = pd.to_numeric(refined_df['Total Square feet'], errors='coerce').fillna(0)
+
         # ----------------------------------------------------------------------
         # 1) Summarize standard ductwork categories in the 3rd column (Qty)
         # ----------------------------------------------------------------------
         print("Summing category values for standard ductwork types...")
-        base_categories = {
-            "Galvanized Steel": "Input Galvanized Steel",
-            "Residential Kitchen": "Input Residential Kitchen",
-            "Commercial Kitchen": "Input Commercial Kitchen",
-            "Aluminum": "Input Aluminum",
-            "Flat Oval": " Input Flat Oval",
-            "316 SS 18 Gauge DX": " (Usually Ignore) Stainless Steel"
-
-        }
-
-        # aggregator for base categories (from the "Qty" column)
-        base_aggregator = {cat: 0 for cat in base_categories}
-
-        # Go through "Refined values" to sum base categories
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, qty, *_ = row  # skip second column, etc.
-            if isinstance(name, str) and isinstance(qty, (int, float)):
-                for cat in base_categories:
-                    # If the category name is present in 'name'
-                    if cat.lower() in name.lower():
-                        base_aggregator[cat] += qty
+
+        # aggregator for base categories: sum the "Qty" of every row whose name contains the category name
+        base_aggregator = sum_by_category(names, qty, BASE_CATEGORIES_RE, BASE_CATEGORIES)
 
         print("Placing ductwork type totals in Mechanical Breakdown (accumulating if needed)...")
-        for cat, label in base_categories.items():
+        placed = 0
+        for cat, label in BASE_CATEGORIES.items():
             new_value = base_aggregator[cat]
-            # Search for cells with the matching label
-            for row in breakdown_sheet.iter_rows(min_row=1, max_col=breakdown_sheet.max_column):
-                for cell in row:
-                    if isinstance(cell.value, str) and label in cell.value:
-                        # The cell to the right is where the numeric total goes
-                        target_cell = breakdown_sheet.cell(row=cell.row, column=cell.column + 1)
-                        # Accumulate if there's already a value
-                        existing_val = target_cell.value
-                        if not isinstance(existing_val, (int, float)):
-                            existing_val = 0
-                        target_cell.value = existing_val + new_value
-                        print(f"{cat} total '{new_value}' added to cell {target_cell.coordinate}. "
-                              f"(Previous: {existing_val}, New: {existing_val + new_value})")
-                        break
+            # Cells with the matching label
+            for row, column in label_locations[label]:
+                # The cell to the right is where the numeric total goes
+                target_cell = breakdown_sheet.cell(row=row, column=column + 1)
+                # Accumulate if there's already a value
+                existing_val = target_cell.value
+                if not isinstance(existing_val, (int, float)):
+                    existing_val = 0
+                total = existing_val + new_value
+                target_cell.value = total
+                placed += 1
+                logger.debug("%s total '%s' added to cell %s. (Previous: %s, New: %s)",
+                             cat, new_value, target_cell.coordinate, existing_val, total)
 
         # ----------------------------------------------------------------------
         # 2) Summarize acoustically lined / insulated / fire-wrapped combos for each base category
@@ -204,71 +274,26 @@ def populate_ductwork(output_file):
         # ----------------------------------------------------------------------
         print("Summarizing Acoustically Lined / Insulated / Fire-Wrapped combos...")
 
-        # Build a dictionary of combos => cell label in Mechanical Breakdown
-        # e.g., "Acoustically Lined Galvanized Steel" => "Input Acoustical Lining (SqFt)"
-        # define "Acoustically Lined *Category*" => same label,
-        # "Insulated *Category*" => same label, etc.
-        sq_categories = {
-            # For each base, define the combos
-            "Acoustically Lined Galvanized Steel": "Input Acoustical Lining (SqFt)",
-            "Insulated Galvanized Steel": "Input Insulation (SqFt)",
-            "Fire Wrapped Galvanized Steel": "Input Fire Wrapped (SqFt)",
-
-            "Acoustically Lined Residential Kitchen": "Input Acoustical Lining (SqFt)",
-            "Insulated Residential Kitchen": "Input Insulation (SqFt)",
-            "Fire Wrapped Residential Kitchen": "Input Fire Wrapped (SqFt)",
-
-            "Acoustically Lined Commercial Kitchen": "Input Acoustical Lining (SqFt)",
-            "Insulated Commercial Kitchen": "Input Insulation (SqFt)",
-            "Fire Wrapped Commercial Kitchen": "Input Fire Wrapped (SqFt)",
-
-            "Acoustically Lined Aluminum": "Input Acoustical Lining (SqFt)",
-            "Insulated Aluminum": "Input Insulation (SqFt)",
-            "Fire Wrapped Aluminum": "Input Fire Wrapped (SqFt)",
-
-            "Acoustically Lined Flat Oval": "Input Acoustical Lining (SqFt)",
-            "Insulated Flat Oval": "Input Insulation (SqFt)",
-            "Fire Wrapped Flat Oval": "Input Fire Wrapped (SqFt)",
-
-            "Acoustically Lined 316 SS 18 Gauge DX": "Input Acoustical Lining (SqFt)",
-            "Insulated 316 SS 18 Gauge DX": "Input Insulation (SqFt)",
-            "Fire Wrapped 316 SS 18 Gauge DX": "Input Fire Wrapped (SqFt)",
-        }
-
         # aggregator for combos from the "Square feet" column (4th col)
-        sq_aggregator = {combo: 0 for combo in sq_categories}
-
-        # Summation from "Refined values" (4th column => sq_ft)
-        for row in refined_sheet.iter_rows(min_row=2, values_only=True):
-            name, _, _, sq_ft, *_ = row
-            if isinstance(name, str) and isinstance(sq_ft, (int, float)):
-                # Check each combo
-                for combo in sq_categories:
-                    if combo.lower() in name.lower():
-                        sq_aggregator[combo] += sq_ft
+        sq_aggregator = sum_by_category(names, sq_ft, SQ_CATEGORIES_RE, SQ_CATEGORIES)
 
         print("Placing acoustical/insulation/fire-wrapped SQFt combos in Mechanical Breakdown (accumulating if needed)...")
-        for combo, label in sq_categories.items():
+        for combo, label in SQ_CATEGORIES.items():
             new_sq_value = sq_aggregator[combo]
-            # Find label in mechanical breakdown
-            for row in breakdown_sheet.iter_rows(min_row=1, max_col=breakdown_sheet.max_column):
-                for cell in row:
-                    if isinstance(cell.value, str) and label in cell.value:
-                        # read existing cell
-                        target_cell = breakdown_sheet.cell(row=cell.row, column=cell.column + 1)
-                        existing_val = target_cell.value
-                        if not isinstance(existing_val, (int, float)):
-                            existing_val = 0
-                        target_cell.value = existing_val + new_sq_value
-                        print(f"{combo} => '{new_sq_value}' added to {label} cell {target_cell.coordinate}. "
-                              f"(Previous: {existing_val}, New: {existing_val + new_sq_value})")
-                        break
-
-        # ----------------------------------------------------------------------
-        # Save the updated workbook
-        # ----------------------------------------------------------------------
-        print(f"Saving changes to {output_file}...")
-        workbook.save(output_file)
+            # Label positions in mechanical breakdown
+            for row, column in label_locations[label]:
+                # read existing cell
+                target_cell = breakdown_sheet.cell(row=row, column=column + 1)
+                existing_val = target_cell.value
+                if not isinstance(existing_val, (int, float)):
+                    existing_val = 0
+                total = existing_val + new_sq_value
+                target_cell.value = total
+                placed += 1
+                logger.debug("%s => '%s' added to %s cell %s. (Previous: %s, New: %s)",
+                             combo, new_sq_value, label, target_cell.coordinate, existing_val, total)
+
+        print(f"Placed {placed} ductwork totals in Mechanical Breakdown.")
         print("Ductwork section populated successfully!")
 
     except Exception as e:
@@ -278,5 +303,8 @@ def populate_ductwork(output_file):
 # Example usage
 if __name__ == "__main__":
     output_file_path = "M Breakdown.xlsx"  # Path to the workbook containing both sheets
-    populate_piping(output_file_path)
-    populate_ductwork(output_file_path)
+    workbook = openpyxl.load_workbook(output_file_path)
+    populate_piping(workbook)
+    populate_ductwork(workbook)
+    print(f"Saving changes to {output_file_path}...")
+    workbook.save(output_file_path)
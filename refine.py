@@ -1,30 +1,29 @@
 import pandas as pd
 from openpyxl import load_workbook
 
-def refine_values(output_file):
+def refine_values(workbook):
     """
     Processes the 'raw input' sheet of an Excel workbook to identify duplicate entries,
     group them by similarity, and sum their Qty and Square Feet values.
-    The refined data is saved in a new sheet called 'Refined values'.
+    The refined data is written to a new sheet called 'Refined values'; saving is left to the caller.
 
     Args:
-        output_file (str): Path to the Excel file where the 'raw input' sheet exists and
-                          where the refined values will be written.
+        workbook (Workbook): The loaded workbook where the 'raw input' sheet exists and
+                             where the refined values will be written.
     """
     try:
-        # Load the workbook and the 'raw input' sheet
-        print("Loading the workbook...")
-        workbook = load_workbook(output_file)
+        # Check for the 'raw input' sheet
         if 'raw input' not in workbook.sheetnames:
             raise ValueError("'raw input' sheet not found in the workbook.")
         
-        # Read the 'raw input' sheet into a DataFrame
+        # Read the 'raw input' sheet into a DataFrame, using the first row as the header
         print("Reading 'raw input' sheet...")
-        raw_input_df = pd.DataFrame(workbook['raw input'].values)
-        
-        # Use the first row as the header and drop the empty rows
-        raw_input_df.columns = raw_input_df.iloc[0]
-        raw_input_df = raw_input_df[1:].dropna(how='all')
+        rows = workbook['raw input'].iter_rows(values_only=True)
+        header = next(rows)
+        raw_input_df = pd.DataFrame(rows, columns=header)
+
+        # Drop the empty rows
+        raw_input_df = raw_input_df.dropna(how='all')
 
         # Ensure the required columns exist
         required_columns = ['Name', 'Qty', 'Units', 'Square feet']
@@ -34,8 +33,12 @@ def refine_values(output_file):
 
         # Automatically clean and convert numbers stored as text to numeric
         print("Cleaning and converting numeric columns...")
-        raw_input_df['Qty'] = pd.to_numeric(raw_input_df['Qty'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
-        raw_input_df['Square feet'] = pd.to_numeric(raw_input_df['Square feet'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+        # Columns that are already numeric skip the text round trip; others have the thousands separator stripped
+        for col in ['Qty', 'Square feet']:
+            values = raw_input_df[col]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = values.astype(str).str.replace(',', '', regex=False)
+            raw_input_df[col] = pd.to_numeric(values, errors='coerce').fillna(0)
 
         # Group by 'Name' and 'Units', and sum the values of 'Qty' and 'Square feet'
         print("Refining and grouping data...")
@@ -56,12 +59,9 @@ def refine_values(output_file):
 
         # Write the refined data to the new sheet
         print("Writing refined data...")
-        for _, row in refined_df.iterrows():
-            refined_sheet.append([row['Name'], row['Units'], row['Qty'], row['Square feet']])
+        for name, units, qty, sq_ft in refined_df[['Name', 'Units', 'Qty', 'Square feet']].itertuples(index=False, name=None):
+            refined_sheet.append((name, units, qty, sq_ft))
 
-        # Save the workbook
-        print(f"Saving changes to {output_file}...")
-        workbook.save(output_file)
         print("Process completed successfully!")
 
     except Exception as e:
@@ -71,4 +71,6 @@ def refine_values(output_file):
 if __name__ == "__main__":
     output_excel_path = "output.xlsx"  # Path to the Excel file
 
-    refine_values(output_excel_path)
+    workbook = load_workbook(output_excel_path)
+    refine_values(workbook)
+    workbook.save(output_excel_path)